@@ -1,14 +1,15 @@
 import dataclasses
+from typing import Optional
 
-@dataclasses.dataclass(order=True, frozen=True)
+@dataclasses.dataclass(order=True, frozen=True, slots=True)
 class QueryReturnValue:
     """Class containing server self.connection data"""
     querytime:  str
     query:      str
-    head:       dataclasses.field(default_factory=list) # pylint: disable=E3701 # pylint is being silly again...
-    ress:       dataclasses.field(default_factory=list) # pylint: disable=E3701
-    ress_len:   int
-    err_:       Exception
+    head:       list                = dataclasses.field(default_factory=list)
+    ress:       list                = dataclasses.field(default_factory=list, compare=False)
+    ress_len:   int                 = 0
+    err_:       Optional[Exception] = dataclasses.field(default=None, compare=False)
 
 # TODO: add generic database template
 # TODO: add spesific database type interfaces gated behind optional requirements
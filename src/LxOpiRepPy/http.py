@@ -1,12 +1,72 @@
-from typing import Any, Callable, Optional
-
-import requests as re
-from fake_useragent import UserAgent
-from stem import Signal
-from stem.control import Controller
+import logging
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Optional
 
 from .logging import log
 
+# requests, stem and fake_useragent are slow to import, they are loaded by _lazy_import
+# when the first AnonimousEngine is created so importing this module stays cheap
+if TYPE_CHECKING:
+    import requests as re
+    from fake_useragent import UserAgent
+
+_ROOT = logging.getLogger() # log() goes through the root logger
+
+def _lazy_import() -> None:
+    """Imports the heavy dependencies of AnonimousEngine into the module namespace."""
+    global re, UserAgent, Signal, Controller # pylint: disable=global-statement,global-variable-undefined,invalid-name
+    import requests as re                    # pylint: disable=import-outside-toplevel,redefined-outer-name
+    from fake_useragent import UserAgent     # pylint: disable=import-outside-toplevel,redefined-outer-name
+    from stem import Signal                  # pylint: disable=import-outside-toplevel
+    from stem.control import Controller      # pylint: disable=import-outside-toplevel
+
+_getaddrinfo = socket.getaddrinfo
+
+def install_dns_cache(ttl: float = 900.0, maxsize: int = 1024) -> None:
+    """
+    Replaces `socket.getaddrinfo` with a process wide caching wrapper,
+    so repeated lookups of the same host (like api.ipify.org on every IP check) skip the resolver.
+
+    Args:
+        ttl (float): Seconds a lookup result is reused for. Defaults to 900.
+        maxsize (int): Maximum number of cached lookups, the least recently used one is evicted first. Defaults to 1024.
+
+    Note:
+        - Calling it again replaces the previous cache and its settings.
+        - Failed lookups are not cached.
+        - Use `uninstall_dns_cache` to restore the original `socket.getaddrinfo`.
+    """
+    cache: OrderedDict = OrderedDict()
+    lock = threading.Lock()
+
+    def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0): # pylint: disable=redefined-builtin,too-many-positional-arguments
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with lock:
+            hit = cache.get(key)
+            if hit is not None and hit[0] > now:
+                cache.move_to_end(key)
+                return list(hit[1])
+
+        res = _getaddrinfo(*key)
+
+        with lock:
+            cache[key] = (now + ttl, res)
+            cache.move_to_end(key)
+            while len(cache) > maxsize:
+                cache.popitem(last=False)
+        return list(res)
+
+    socket.getaddrinfo = getaddrinfo
+
+def uninstall_dns_cache() -> None:
+    """Restores the `socket.getaddrinfo` that was in place before `install_dns_cache`."""
+    socket.getaddrinfo = _getaddrinfo
+
 class AnonimousEngine:
     """
     Stubborn and anonymous requests engine using Tor for anonymity.
@@ -15,8 +75,9 @@ class AnonimousEngine:
         s_conf (str): Configuration for the Tor SOCKS proxy.
         controller: Stem Controller for interacting with Tor.
         session (requests.Session): HTTP session for making requests.
-        eip (Optional[Exception]): Exception encountered during IP retrieval.
-        cip (str): Current external IP address.
+        eip (Optional[Exception]): Exception encountered during IP retrieval or the last connection failure.
+        cip (str): External IP address as of the last check.
+        ip_check_ttl (float): Seconds during which a successful IP check is trusted for new circuits.
 
     Methods:
         __init__(password: str = "password", s_conf: str = "socks5://localhost:9050"):
@@ -36,7 +97,22 @@ class AnonimousEngine:
 
         _retry_loop(func: Callable[[Any], requests.Response], *args, **kwargs) -> requests.Response:
             Internal method implementing a retry loop for request execution in case of exceptions.
+
+        _ip_check_due() -> bool:
+            Tells whether the next circuit has to be checked with check_ip.
+
+        _backoff(attempt: int) -> None:
+            Sleeps before the next retry with exponential backoff and jitter.
     """
+    _UA: ClassVar[Optional["UserAgent"]] = None # shared by every engine, loading the dataset is slow
+
+    # _retry_loop sleeps min(backoff_cap, backoff_base * 2 ** attempt) + up to backoff_jitter seconds
+    backoff_base:   ClassVar[float] = 0.5
+    backoff_cap:    ClassVar[float] = 30.0
+    backoff_jitter: ClassVar[float] = 0.5
+
+    ip_check_ttl: ClassVar[float] = 60.0
+
     def __init__(self,
                  password: str = "password",
                  s_conf:   str = "socks5://localhost:9050"):
@@ -47,31 +123,56 @@ class AnonimousEngine:
             password (str): Password for authenticating with the Tor controller. Defaults to "password".
             s_conf (str): Configuration for the Tor SOCKS proxy. Defaults to "socks5://localhost:9050".
         """
+        _lazy_import()
+
         self.s_conf = {"http": s_conf, "https": s_conf}
 
+        if AnonimousEngine._UA is None:
+            AnonimousEngine._UA = UserAgent()
+
         self.controller = Controller.from_port()
         self.controller.authenticate(password=password)
 
-        self.session: re.Session      = None
+        self.session: re.Session      = re.Session()
+        self.session.proxies          = self.s_conf
         self.eip: Optional[Exception] = None
         self.cip: str                 = ""
 
+        self._ip_checked_at: Optional[float] = None
+
+        self._tag = f"[ AnonimousEngine {id(self)} ]" # prefix of this engine's debug logs
+
         self.get_new_ip()
 
     def get_new_ip(self) -> None:
         """
         Gets a new IP address by signaling Tor to create a new circuit and checks its reliability.
+
+        The check is skipped while the last successful one is younger than ip_check_ttl,
+        unless the previous IP check or request failed (eip is set).
+        Failed checks are retried on new circuits after the same backoff as failed requests.
         """
-        bad = True
-        while bad:
+        attempt = 0
+        while True:
             # "signal NEWNYM" will make Tor switch to clean circuits
             # so new application requests don't share any circuits with old ones.
             # this effectively resets the external IP
             self.controller.signal(Signal.NEWNYM) # pylint: disable=no-member
-            self.session = re.Session()
-            self.session.proxies = self.s_conf
-            self.session.headers.update({"User-Agent": UserAgent().random})
-            bad = self.check_ip()
+            # pooled keep-alive connections stay pinned to the old circuit and cookies
+            # would link both identities, drop them but keep the session itself around
+            self.session.close()
+            self.session.cookies.clear()
+            self.session.headers.update({"User-Agent": self._UA.random})
+            if not (self._ip_check_due() and self.check_ip()):
+                return
+            self._backoff(attempt) # during outages every check fails, do not hammer Tor and ipify
+            attempt += 1
+
+    def _ip_check_due(self) -> bool:
+        """Whether the next circuit has to go through check_ip."""
+        return (self.eip is not None
+                or self._ip_checked_at is None
+                or time.monotonic() - self._ip_checked_at > self.ip_check_ttl)
 
     def check_ip(self) -> bool:
         """
@@ -85,19 +186,24 @@ class AnonimousEngine:
         # I considere a node evil if it messes with HTTPs conecctions, whitch is unacceptable.
 
         try:
-            self.cip, self.eip = str(self.session.get("https://api.ipify.org/?format=json").json()["ip"]), None
+            response = self.session.get("https://api.ipify.org/?format=json")
+            # a tampered response is usually an HTML page, tell by the header instead of scanning the body
+            if not response.headers.get("content-type", "").startswith("application/json"):
+                raise re.exceptions.InvalidJSONError("not a JSON response", response=response)
+            self.cip, self.eip = str(response.json()["ip"]), None
         except (re.exceptions.RequestException, re.exceptions.Timeout) as e:
             self.cip, self.eip = Exception('IP_NOT_KNOWN'), e
-            log(f"DBG_:  [ AnonimousEngine {id(self)} ]: " + repr(e))
+            if _ROOT.isEnabledFor(logging.DEBUG):
+                log("DBG_: " + self._tag + ": " + repr(e))
             return True
 
-        if "DOCTYPE" in str(self.cip):
-            log(f"DBG_: [ AnonimousEngine {id(self)} ]: NEW EXTERNAL IP‽")
-        else:
-            log(f"DBG_: [ AnonimousEngine {id(self)} ]: NEW EXTERNAL IP! [ {self.cip} ]")
+        self._ip_checked_at = time.monotonic()
+
+        if _ROOT.isEnabledFor(logging.DEBUG):
+            log("DBG_: " + self._tag + f": NEW EXTERNAL IP! [ {self.cip} ]")
         return False
 
-    def get(self, url: str, *args, **kwargs) -> re.Response:
+    def get(self, url: str, *args, **kwargs) -> "re.Response":
         """
         Sends a GET request to the specified URL using the configured session.
 
@@ -111,7 +217,7 @@ class AnonimousEngine:
         """
         return self._retry_loop(self.session.get, *args, url=url, **kwargs)
 
-    def post(self, url: str, *args, **kwargs) -> re.Response:
+    def post(self, url: str, *args, **kwargs) -> "re.Response":
         """
         Sends a POST request to the specified URL using the configured session.
 
@@ -125,10 +231,15 @@ class AnonimousEngine:
         """
         return self._retry_loop(self.session.post, *args, url=url, **kwargs)
 
-    def _retry_loop(self, func: Callable[[Any], re.Response], *args, **kwargs) -> re.Response:
+    def _retry_loop(self, func: Callable[[Any], "re.Response"], *args, **kwargs) -> "re.Response":
         """
         Internal method implementing a retry loop for request execution in case of exceptions.
 
+        Failed attempts are retried after an exponential backoff with jitter.
+        Only connection level failures (the circuit is probably bad) switch to a new IP,
+        any other request exception is just retried on the current one.
+        Malformed requests (bad URLs, headers or JSON bodies) can never succeed, their exceptions are re-raised.
+
         Args:
             func (Callable[[Any], requests.Response]): Function to execute.
             *args: Variable length argument list to be passed to func.
@@ -136,13 +247,32 @@ class AnonimousEngine:
 
         Returns:
             requests.Response: The response object from the executed function.
+
+        Raises:
+            requests.exceptions.RequestException: If the request itself is invalid
+                (MissingSchema, InvalidSchema, InvalidURL, InvalidHeader, InvalidJSONError, URLRequired).
         """
-        j = None
-        while j is None:
+        attempt = 0
+        while True:
             try:
-                j: re.Response = func(*args, **kwargs)
-            except (re.exceptions.RequestException, re.exceptions.Timeout) as e:
-                log(f"DBG_: [ AnonimousEngine {id(self)} ]: {repr(e)}")
+                return func(*args, **kwargs)
+            except (re.exceptions.MissingSchema, re.exceptions.InvalidSchema, re.exceptions.InvalidURL,
+                    re.exceptions.InvalidHeader, re.exceptions.InvalidJSONError, re.exceptions.URLRequired):
+                raise # retrying would fail the same way forever
+            except (re.exceptions.ConnectionError, re.exceptions.Timeout, re.exceptions.ChunkedEncodingError) as e:
+                if _ROOT.isEnabledFor(logging.DEBUG):
+                    log("DBG_: " + self._tag + ": " + repr(e))
+                self.eip = e # make sure the next circuit gets checked
+                self._backoff(attempt)
                 self.get_new_ip()
-                j = None
-        return j
+            except re.exceptions.RequestException as e:
+                if _ROOT.isEnabledFor(logging.DEBUG):
+                    log("DBG_: " + self._tag + ": " + repr(e))
+                self._backoff(attempt)
+            attempt += 1
+
+    def _backoff(self, attempt: int) -> None:
+        """Sleeps before the next retry, doubling the delay on every attempt up to backoff_cap."""
+        # the exponent is clamped, 2 ** 1024 overflows a float long after the cap is reached
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** min(attempt, 32)))
+        time.sleep(delay + random.uniform(0, self.backoff_jitter))
@@ -1,13 +1,25 @@
 import asyncio
 import base64
+import concurrent.futures
 import dataclasses
 import datetime as dt
+import functools
+import itertools
 import json
 import os
+import threading
 from decimal import Decimal
 from pprint import pformat
 import time
-from typing import Any, Dict, Generator, Optional, Union
+from typing import Any, Callable, Dict, Generator, Optional, Union
+
+# FAST JSON!
+try:
+    import orjson
+
+    ORJSON_IMPORTED = True
+except ImportError:
+    ORJSON_IMPORTED = False
 
 def or_none(o: Optional[object]) -> Optional[object]:
     """return o if o else None"""
@@ -27,19 +39,85 @@ def clean(o: Any) -> Union[int, float, bool, dict, list]:
     Note:
         - For input types like Generator, list, tuple: Converts to a list of cleaned elements.
         - For dataclasses: Converts to a dictionary and cleans the contents.
-        - For dictionaries: Recursively cleans keys and values.
+        - For dictionaries: Cleans the values, keys that are not primitives are converted to strings.
         - For int, float, bool, or None: Returns the same value.
         - For other types: Converts to a string representation.
+        - The input is walked with an explicit stack, so deeply nested objects do not hit the recursion limit.
+
+    Raises:
+        - ValueError: If the object contains itself (a circular reference).
     """
+    out = [None]
+    stack = [(out, 0, o)]
+    path = set() # ids of the containers being walked, their children are still on the stack
+    while stack:
+        parent, key, o = stack.pop()
+
+        if parent is None: # all children of container `key` are done
+            path.discard(key)
+            continue
+
+        kind = _CLEAN_KINDS.get(type(o))
+        if kind is None:
+            kind = _clean_kind(o)
+
+        if kind in (_CLEAN_PRIMITIVE, _CLEAN_STR):
+            parent[key] = o if kind == _CLEAN_PRIMITIVE else str(o)
+            continue
+
+        if id(o) in path:
+            raise ValueError("Circular reference detected")
+        path.add(id(o))
+        stack.append((None, id(o), o)) # popped once every child below it is done, holding o keeps its id unique
+
+        if kind == _CLEAN_SEQ:
+            items = o if isinstance(o, (list, tuple)) else list(o)
+            new = parent[key] = [None] * len(items)
+            # pushed in reverse so children are popped (and assigned) in order
+            stack.extend(zip(itertools.repeat(new), range(len(items) - 1, -1, -1), reversed(items)))
+        elif kind == _CLEAN_DICT:
+            new = parent[key] = {}
+            stack.extend(reversed([(new, _clean_key(k), v) for k, v in o.items()]))
+        elif kind == _CLEAN_DATACLASS:
+            new = parent[key] = {}
+            stack.extend(reversed([(new, k, v) for k, v in _shallow_asdict(o).items()]))
+    return out[0]
+
+_CLEAN_PRIMITIVE, _CLEAN_SEQ, _CLEAN_DICT, _CLEAN_DATACLASS, _CLEAN_STR = range(5)
+
+_CLEAN_KINDS = {
+    int:        _CLEAN_PRIMITIVE,
+    float:      _CLEAN_PRIMITIVE,
+    bool:       _CLEAN_PRIMITIVE,
+    type(None): _CLEAN_PRIMITIVE,
+    str:        _CLEAN_STR,
+    list:       _CLEAN_SEQ,
+    tuple:      _CLEAN_SEQ,
+    dict:       _CLEAN_DICT,
+}
+
+def _clean_kind(o: Any) -> int:
+    """slow path for subclasses, generators and dataclasses that miss the exact type lookup"""
     if isinstance(o, (Generator, list, tuple)):
-        return list(clean(x) for x in o)
-    if dataclasses.is_dataclass(o):
-        return clean(dataclasses.asdict(o))
+        return _CLEAN_SEQ
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return _CLEAN_DATACLASS
     if isinstance(o, dict):
-        return {(clean(k), clean(v)) for k, v in o.items()}
-    if isinstance(o, (int, float, bool)) or (o is None):
-        return o
-    return str(o)
+        return _CLEAN_DICT
+    if isinstance(o, (int, float, bool)):
+        return _CLEAN_PRIMITIVE
+    return _CLEAN_STR
+
+def _shallow_asdict(o: Any) -> dict:
+    """
+    `dataclasses.asdict` without the deep copy: only the top level fields are read,
+    nested values are left for the caller's own walk.
+    """
+    return {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+
+def _clean_key(k: Any) -> Union[int, float, bool, str, None]:
+    """dict keys must stay hashable, so anything but a primitive becomes a string"""
+    return k if _CLEAN_KINDS.get(type(k)) == _CLEAN_PRIMITIVE else str(k)
 
 def win_slug(fname: Union[str, os.PathLike], rep: str = '_') -> str:
     """
@@ -63,7 +141,35 @@ def win_slug(fname: Union[str, os.PathLike], rep: str = '_') -> str:
         ('<', '>', ':', '"', '/', '|', '?', '\\', '*', etc) with the specified
         replacement character.
     """
-    return(''.join((char if char.lower() in '-_.() abcdefghijklmnopqrstuvwxyz0123456789' else rep) for char in fname))
+    fname = os.fspath(fname)
+    table = _win_slug_bytes_table(rep)
+    if table is not None:
+        # nothing outside ASCII is allowed, 'replace' turns each such character into one '?' that the table maps to rep
+        return fname.encode('ascii', 'replace').translate(table).decode('ascii')
+    return fname.translate(_win_slug_table(rep))
+
+_WIN_SLUG_CHARS = frozenset('-_.() abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+
+class _WinSlugTable(dict):
+    """`str.translate` table keeping the allowed characters and mapping anything else to `rep`"""
+    def __init__(self, rep: str):
+        super().__init__((ord(c), c) for c in _WIN_SLUG_CHARS)
+        self.rep = rep
+
+    def __missing__(self, key: int) -> str:
+        self[key] = self.rep # remember it so the next lookup stays in C
+        return self.rep
+
+@functools.lru_cache(maxsize=None)
+def _win_slug_table(rep: str) -> _WinSlugTable:
+    return _WinSlugTable(rep)
+
+@functools.lru_cache(maxsize=None)
+def _win_slug_bytes_table(rep: str) -> Optional[bytes]:
+    """`bytes.translate` table for the common single ASCII character `rep`, None otherwise"""
+    if len(rep) != 1 or not rep.isascii():
+        return None
+    return bytes(i if chr(i) in _WIN_SLUG_CHARS else ord(rep) for i in range(256))
 
 class JsonEncoder(json.JSONEncoder):
     """
@@ -77,7 +183,9 @@ class JsonEncoder(json.JSONEncoder):
             - dt.datetime, dt.date: Converts datetime objects to ISO 8601 format strings.
             - Decimal: Converts Decimal objects to float for JSON serialization.
             - bytes: Encodes bytes to Base64 strings for JSON serialization.
-            - Dataclasses: Converts dataclass instances to dictionaries using `dataclasses.asdict`.
+            - Dataclasses: Converts dataclass instances to dictionaries of their fields,
+              nested values are left to the encoder instead of being deep copied.
+        - _slow_default(o): Fallback of `default` for subclasses of the types above and for dataclasses.
 
     Usage:
         Instantiate this class and pass it to the `json.dump` or `json.dumps` method
@@ -89,6 +197,16 @@ class JsonEncoder(json.JSONEncoder):
         json_str = json.dumps(data, cls=custom_encoder)
         ```
     """
+    # exact type -> handler, subclasses are resolved through their MRO by _slow_default
+    _DISPATCH = {
+        set:         list,
+        Exception:   pformat,
+        dt.datetime: dt.datetime.isoformat,
+        dt.date:     dt.date.isoformat,
+        Decimal:     float,
+        bytes:       lambda o: base64.b64encode(o).decode('utf-8'),
+    }
+
     def default(self, o):
         """
         Overrides the default method of `json.JSONEncoder` to handle encoding
@@ -108,54 +226,187 @@ class JsonEncoder(json.JSONEncoder):
             datetime objects, Decimal, bytes, and dataclasses, converting them into
             JSON-serializable representations.
         """
-        if isinstance(o, set):
-            return list(o)
-        if isinstance(o, Exception):
-            return pformat(o)
-        if isinstance(o, dt.datetime):
-            return o.isoformat()
-        if isinstance(o, dt.date):
-            return o.isoformat()
-        if isinstance(o, Decimal):
-            return float(o)
-        if isinstance(o, bytes):
-            return base64.b64encode(o).decode('utf-8')
+        handler = self._DISPATCH.get(type(o))
+        if handler is None:
+            return self._slow_default(o)
+        return handler(o)
+
+    def _slow_default(self, o):
+        """Handles subclasses of the dispatched types (caching their handler) and dataclasses."""
+        handler = _resolve_json_handler(type(self), type(o))
+        if handler is not None:
+            return handler(o)
         if dataclasses.is_dataclass(o):
-            return dataclasses.asdict(o)
+            return _shallow_asdict(o)
         return json.JSONEncoder.default(self, o)
 
+# bounded and kept apart from the declared _DISPATCH tables, dynamically created types would make them grow forever
+@functools.lru_cache(maxsize=256)
+def _resolve_json_handler(encoder_cls: type, typ: type) -> Optional[Callable[[Any], Any]]:
+    """handler of the closest base of typ in encoder_cls' _DISPATCH table, None if there is none"""
+    for base in typ.__mro__[1:]:
+        handler = encoder_cls._DISPATCH.get(base) # pylint: disable=protected-access
+        if handler is not None:
+            return handler
+    return None
+
+_JSON_ENCODER = JsonEncoder()
+
+def json_dumps(o: Any) -> bytes:
+    """
+    Serializes the given object to UTF-8 encoded JSON, supporting the same extra types as `JsonEncoder`.
+
+    Args:
+        - o (Any): The object to be serialized.
+
+    Returns:
+        - bytes: The JSON document.
+
+    Note:
+        - If 'orjson' is installed it is used, it encodes datetimes, dates and dataclasses natively
+          and only calls `JsonEncoder.default` for the remaining types.
+        - Otherwise falls back to `json.dumps` with `JsonEncoder`.
+    """
+    if ORJSON_IMPORTED:
+        return orjson.dumps(o, default=_JSON_ENCODER.default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(o, cls=JsonEncoder).encode('utf-8')
+
+def json_loads(s: Union[bytes, str]) -> Any:
+    """
+    Deserializes a JSON document, using 'orjson' if it is installed.
+
+    Args:
+        - s (Union[bytes, str]): The JSON document.
+
+    Returns:
+        - Any: The decoded object.
+
+    Raises:
+        - json.JSONDecodeError: If the document is not valid JSON (`orjson.JSONDecodeError` is a subclass).
+    """
+    if ORJSON_IMPORTED:
+        return orjson.loads(s)
+    return json.loads(s)
+
+# fdatasync skips flushing metadata that is not needed to read the data back, not available everywhere
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+def _atomic_write(fpath: Union[os.PathLike, str], payload: bytes):
+    """
+    Writes payload to a temporary sibling file, syncs it to disk and moves it over fpath,
+    so readers see either the old or the new content but never a partially written file.
+    """
+    fpath = os.fspath(fpath)
+    # one temporary file per writer thread, concurrent writers must not move each other's files
+    # (not tempfile.mkstemp, its files are private to the owner instead of following the umask)
+    tmp = f"{fpath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # raw fd, the payload is written in one go so a buffered file object only adds copies
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+            _fdatasync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, fpath)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_dir(os.path.dirname(fpath) or '.')
+
+def _fsync_dir(dpath: str):
+    """Syncs a directory, so a rename inside it survives a power loss."""
+    if not hasattr(os, 'O_DIRECTORY'): # directories can not be opened on Windows
+        return
+    fd = os.open(dpath, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# primary and backup files are independent (possibly on different mounts), so they are written concurrently
+_IO_POOL: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+def _io_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """the shared write pool, created on first use"""
+    global _IO_POOL # pylint: disable=global-statement
+    if _IO_POOL is None:
+        _IO_POOL = concurrent.futures.ThreadPoolExecutor(2, thread_name_prefix='lastt')
+    return _IO_POOL
+
+def _reset_io_pool():
+    """forked children inherit the pool's state but not its threads, submitting to it would hang forever"""
+    global _IO_POOL # pylint: disable=global-statement
+    _IO_POOL = None
+
+if hasattr(os, 'register_at_fork'): # not on Windows
+    os.register_at_fork(after_in_child=_reset_io_pool)
+
+def _write_store(fname: str, fname_bkp: str, payload: bytes, bkp: bool):
+    """Atomically writes payload to fname and, if bkp is set, to fname_bkp at the same time."""
+    if not bkp:
+        _atomic_write(fname, payload)
+        return
+    try:
+        pool = _io_pool()
+        futures = (pool.submit(_atomic_write, fname, payload), pool.submit(_atomic_write, fname_bkp, payload))
+    except RuntimeError: # no new futures during interpreter shutdown (atexit handlers saving their stores)
+        _atomic_write(fname, payload)
+        _atomic_write(fname_bkp, payload)
+        return
+    concurrent.futures.wait(futures)
+    for future in futures:
+        future.result() # re-raise write errors in the caller
+
 class LastTimeStore:
     """
     A class to manage the retrieval and storage of the last recorded time.
 
     Attributes:
-        - fname (Union[os.PathLike, str]):
+        - fname (str):
             The file path or file name (default: 'last_time.json').
         - fname_bkp (str):
             The backup file name created based on 'fname'.
+        - bkp_interval (int):
+            The backup file is refreshed every 'bkp_interval' calls to 'set' (default: 10).
         - last_time (dt.datetime):
             The last recorded time.
 
     Methods:
-        - __init__(self, fname: Union[os.PathLike, str] = 'last_time.json'):
+        - __init__(self, fname: Union[os.PathLike, str] = 'last_time.json', bkp_interval: int = 10):
             Initializes the LastTimeGetter instance.
         - get(self) -> dt.datetime:
             Retrieves the last recorded time from the specified file.
         - set(self, time: dt.datetime = None):
             Sets the last recorded time and updates the file accordingly.
     """
-    def __init__(self, fname: Union[os.PathLike, str] = 'last_time.json'):
+    def __init__(self, fname: Union[os.PathLike, str] = 'last_time.json', bkp_interval: int = 10):
         """
         Initializes the LastTimeGetter instance.
 
         Args:
             - fname (Union[os.PathLike, str]):
                 The file path or file name (default: 'last_time.json').
+            - bkp_interval (int):
+                Refresh the backup file every n calls to 'set' (default: 10).
+
+        Raises:
+            - ValueError: If 'bkp_interval' is less than 1.
         """
-        self.fname = fname
+        self.fname = os.fspath(fname)
+
+        root, ext = os.path.splitext(self.fname)
+        self.fname_bkp = f"{root}_bkp{ext}" # last_time_bkp.json
 
-        n = fname.split('.')
-        self.fname_bkp = '.'.join(n[:-1]) + '_bkp.' + n[-1] # last_time_bkp.json
+        if bkp_interval < 1:
+            raise ValueError(f"bkp_interval must be at least 1, got {bkp_interval!r}")
+        self.bkp_interval = bkp_interval
+        self._sets        = 0
 
         self.last_time = None
         self.get()
@@ -189,52 +440,60 @@ class LastTimeStore:
             - fpath (Union[os.PathLike, str]):
                 The file path to retrieve data from.
         """
-        with open(fdir, 'r', encoding='utf-8') as file:
-            self.last_time = dt.datetime.fromisoformat(json.load(file))
+        with open(fdir, 'rb') as file:
+            self.last_time = dt.datetime.fromisoformat(json_loads(file.read()))
 
     def set(self, time: dt.datetime = None): # pylint: disable=redefined-outer-name # go away pylint
         """
         Set the last accessed time.
 
         Sets the last accessed time to the provided time or the current time if not specified.
-        Updates both the primary and backup files with the new last accessed time.
+        Atomically replaces the primary file with the new last accessed time,
+        the backup file is refreshed the same way every 'bkp_interval' calls.
 
         Args:
             - time (dt.datetime, optional):
                 The time to set as the last accessed time. Defaults to None.
         """
-        if time is None:
-            self.last_time = dt.datetime.now()
-        with open(self.fname, 'w', encoding='utf-8') as file:
-            json.dump(self.last_time.isoformat(), file)
-        with open(self.fname_bkp, 'w', encoding='utf-8') as bkp:
-            json.dump(self.last_time.isoformat(), bkp)
+        self.last_time = dt.datetime.now() if time is None else time
+
+        payload = json_dumps(self.last_time.isoformat())
+
+        _write_store(self.fname, self.fname_bkp, payload, self._sets % self.bkp_interval == 0)
+        self._sets += 1
 
 class LastTimeMemoryStore:
     """
     A class to manage the storage and retrieval of memory related to time progress.
 
     Attributes:
-        - fname (Union[os.PathLike, str]):
+        - fname (str):
             The file path or file name (default: 'last_memory.json').
         - fname_bkp (str):
             The backup file name created based on 'fname'.
+        - bkp_interval (int):
+            The backup file is refreshed every 'bkp_interval' calls to 'set' (default: 10).
         - memory (Optional[Dict[int, dt.datetime]]):
             Dictionary storing progress with integer keys and datetime values.
 
     Methods:
-        - __init__(self, fname: Union[os.PathLike, str] = 'last_memory.json'):
+        - __init__(self, fname: Union[os.PathLike, str] = 'last_memory.json', bkp_interval: int = 10):
             Initializes the LastTimeMemoryStore instance.
         - get(self) -> Dict[int, dt.datetime]:
             Retrieves the stored progress from the specified file.
         - set(self, progress: Optional[Dict[int, dt.datetime]] = None):
             Sets the stored progress and updates the file accordingly.
     """
-    def __init__(self, fname: Union[os.PathLike, str] = 'last_memory.json'):
-        self.fname = fname
+    def __init__(self, fname: Union[os.PathLike, str] = 'last_memory.json', bkp_interval: int = 10):
+        self.fname = os.fspath(fname)
+
+        root, ext = os.path.splitext(self.fname)
+        self.fname_bkp = f"{root}_bkp{ext}" # last_memory_bkp.json
 
-        n = fname.split('.')
-        self.fname_bkp = '.'.join(n[:-1]) + '_bkp.' + n[-1] # last_memory_bkp.json
+        if bkp_interval < 1:
+            raise ValueError(f"bkp_interval must be at least 1, got {bkp_interval!r}")
+        self.bkp_interval = bkp_interval
+        self._sets        = 0
 
         self.memory = None
         self.get()
@@ -244,7 +503,8 @@ class LastTimeMemoryStore:
         Retrieve the stored progress.
 
         Retrieves the stored progress from the specified file.
-        If the file does not exist or encounters a JSON decoding error, it defaults to an empty dictionary.
+        If neither the file nor its backup can be read (missing, not valid JSON or not a JSON object),
+        it defaults to an empty dictionary.
 
         Returns:
             - Dict[int, dt.datetime]:
@@ -252,11 +512,12 @@ class LastTimeMemoryStore:
         """
         try:
             d = self._get(self.fname)
-        except (FileNotFoundError, json.JSONDecodeError):
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
             try:
                 d = self._get(self.fname_bkp)
-            except (FileNotFoundError, json.JSONDecodeError):
-                return {}
+            except (FileNotFoundError, json.JSONDecodeError, TypeError):
+                self.memory = {} # set() must never write a null document
+                return self.memory
 
         self.memory = dict((int(k), dt.datetime.fromisoformat(v)) for k, v in d.items())
 
@@ -272,16 +533,23 @@ class LastTimeMemoryStore:
         Returns:
             - Dict[str, dt.datetime]:
                 Dictionary containing progress retrieved from the file with string keys and datetime values.
+
+        Raises:
+            - TypeError: If the file holds valid JSON that is not an object.
         """
-        with open(fpath, 'r', encoding="utf-8") as file:
-            return json.loads(file.read())
+        with open(fpath, 'rb') as file:
+            d = json_loads(file.read())
+        if not isinstance(d, dict):
+            raise TypeError(f"{fpath} does not hold a JSON object")
+        return d
 
     def set(self, progress: Optional[Dict[int, dt.datetime]] = None):
         """
         Set the stored progress.
 
         Sets the stored progress to the provided progress or the existing memory if not specified.
-        Updates both the primary and backup files with the new stored progress.
+        Atomically replaces the primary file with the new stored progress,
+        the backup file is refreshed the same way every 'bkp_interval' calls.
 
         Args:
             - progress (Optional[Dict[int, dt.datetime]]):
@@ -290,12 +558,11 @@ class LastTimeMemoryStore:
         if progress is None:
             progress = self.memory
 
-        progress = json.dumps(dict((k, v.isoformat()) for k, v in progress.items()))
+        # datetimes and int keys are handled by the encoder, no intermediate dict of isoformat strings
+        progress = json_dumps(progress)
 
-        with open(self.fname,     'w', encoding="utf-8") as file:
-            file.write(progress)
-        with open(self.fname_bkp, 'w', encoding="utf-8") as file:
-            file.write(progress)
+        _write_store(self.fname, self.fname_bkp, progress, self._sets % self.bkp_interval == 0)
+        self._sets += 1
 
 class RateLimiter:
     """
@@ -347,16 +614,18 @@ class RateLimiter:
 
     def rate_check(self):
         """Perform the rate limit check and block if necessary based on the acknowledgment flag."""
-        wait = (self.res + self.target_limit - self.epoch) > 0
-        if wait and self._akt:
-            time.sleep(wait)
+        if self._akt:
+            time.sleep(self._wait())
             self.res = time.time()
             self._akt = False
 
     async def async_rate_check(self):
         """Perform the rate limit check and block the task if necessary based on the acknowledgment flag."""
-        wait = (self.res + self.target_limit - self.epoch) > 0
-        if wait and self._akt:
-            asyncio.sleep(wait)
+        if self._akt:
+            await asyncio.sleep(self._wait())
             self.res = time.time()
             self._akt = False
+
+    def _wait(self) -> float:
+        """Seconds left until target_limit has passed since the last rate limit check."""
+        return max(0.0, float(self.res + self.target_limit - time.time()))
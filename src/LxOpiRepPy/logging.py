@@ -1,3 +1,5 @@
+import itertools
+import json
 import logging
 import sys
 
@@ -10,15 +12,123 @@ from tqdm.auto import tqdm # pylint: disable=import-error # bug
 try:
     import colorama as col
 
-    # see https://github.com/tartley/col/issues/21
-    # breaks some windows systems but fixes other windows systems
-    col.deinit()
-    col.init(strip=False)
+    # stdout/stderr only need wrapping once per process, reloading this module
+    # (test runners, notebooks, ...) must not wrap them again
+    if not getattr(col, '_LxOpiRepPy_initialized', False):
+        # see https://github.com/tartley/col/issues/21
+        # breaks some windows systems but fixes other windows systems
+        col.deinit()
+        col.init(strip=False)
+        col._LxOpiRepPy_initialized = True # pylint: disable=protected-access
 
     COL_IMPORTED = True
 except ImportError:
     COL_IMPORTED = False
 
+# escape sequences are just noise in files and pipes, only color interactive terminals.
+# log()'s colors are baked into its messages before a handler is picked and the handlers go to stderr
+# (logging's default) or stdout (tqdm.write), so both have to be terminals
+COL_IMPORTED = COL_IMPORTED and all(stream is not None and stream.isatty() for stream in (sys.stdout, sys.stderr))
+
+# log() writes to the root logger, bound once like Logger.info does internally
+_ROOT       = logging.getLogger()
+_IS_ENABLED = _ROOT.isEnabledFor
+_LOG_IMPL   = _ROOT._log # pylint: disable=protected-access
+
+# tag -> (log level, color prefix, color prefix + "%s" + reset), built once so log() does a single lookup
+_LEVELS = {
+    'DBG_': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARN': logging.WARN,
+    'ERR_': logging.ERROR,
+    'FATA': logging.FATAL,
+}
+_COLORS = {
+    'DBG_': col.Fore.LIGHTBLACK_EX + col.Back.BLACK,
+    'INFO': col.Fore.WHITE         + col.Back.BLACK,
+    'WARN': col.Fore.YELLOW        + col.Back.BLACK,
+    'ERR_': col.Fore.RED           + col.Back.BLACK,
+    'FATA': col.Fore.BLACK         + col.Back.RED,
+} if COL_IMPORTED else {}
+
+# appended to colored lines only, so colors do not bleed into the next one
+_RESET = col.Style.RESET_ALL if COL_IMPORTED else ""
+
+def _case_variants(tag: str) -> set:
+    """every upper/lower case spelling of tag"""
+    return {''.join(chars) for chars in itertools.product(*({c.lower(), c.upper()} for c in tag))}
+
+# keyed by every case variant of each tag, so log() matches case-insensitively with a single lookup
+_PREFIX_TABLE: dict = {}
+
+# INFO's entry, used for messages without a tag
+_DEFAULT: tuple = (logging.INFO, "", "%s")
+
+# level -> color of the built-in tag logging at it, used for records without a tag
+_LEVEL_COLORS: dict = {}
+
+def register_tag(tag: str, level: int, color: str = ""):
+    """
+    Registers a new prefix for `log`, or redefines an existing one.
+
+    Redefining a built-in tag also changes the messages that fall back to it: 'INFO' is used for messages
+    without a known prefix, and the built-in tags' colors are used by `ColorFormatter` and `PrefixColorFilter`
+    for records without one.
+
+    Args:
+    - tag (str): The four character prefix, matched case-insensitively.
+    - level (int): The logging level of the messages starting with the prefix.
+    - color (str): The escape sequence prepended to those messages when colors are enabled
+      (for example `colorama.Fore.CYAN`). Defaults to no color.
+
+    Raises:
+    - ValueError: If the tag is not four characters long.
+
+    Example:
+    >>> register_tag('NOTE', logging.INFO, colorama.Fore.CYAN)
+    >>> log("NOTE: This is a note.")
+    """
+    if len(tag) != 4:
+        raise ValueError(f"log() tags are four characters long, got {tag!r}")
+    pre = color if COL_IMPORTED else ""
+    entry = (level, pre, pre.replace('%', '%%') + "%s" + _RESET) if pre else (level, pre, "%s")
+    for variant in _case_variants(tag):
+        _PREFIX_TABLE[variant] = entry
+
+    if tag.upper() in _LEVELS:
+        _refresh_fallbacks()
+
+def _refresh_fallbacks():
+    """rebuilds _DEFAULT and _LEVEL_COLORS from the current built-in tags"""
+    global _DEFAULT # pylint: disable=global-statement
+    _DEFAULT = _PREFIX_TABLE.get('INFO', _DEFAULT)
+    _LEVEL_COLORS.clear()
+    _LEVEL_COLORS.update((_PREFIX_TABLE[tag][0], _PREFIX_TABLE[tag][1]) for tag in _LEVELS if tag in _PREFIX_TABLE)
+
+for _tag, _level in _LEVELS.items():
+    register_tag(_tag, _level, _COLORS.get(_tag, ""))
+
+def _format(obj: Any) -> str:
+    """log()'s formatting of anything that is not a string"""
+    if isinstance(obj, (int, float, bool)):
+        return repr(obj)
+    if isinstance(obj, (dict, list, tuple)):
+        try: # single line by construction and done in C, unlike pformat
+            return json.dumps(obj, default=repr, ensure_ascii=False)
+        except (TypeError, ValueError): # non string keys, circular references
+            pass
+    return pformat(obj, indent=4, width=sys.maxsize)
+
+class _Formatted: # pylint: disable=too-few-public-methods
+    """Formats the wrapped object with _format only when a handler actually builds the message."""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return _format(self.obj)
+
 def log(obj: Any):
     """
     Formats and logs the given object with color-coded prefixes indicating log levels.
@@ -26,7 +136,9 @@ def log(obj: Any):
     Args:
     - obj (object): The object to be logged.
 
-    The function uses the `pformat` method from the `pprint` module to format the object.
+    Strings are logged as they are, numbers through `repr`, dictionaries, lists and tuples as JSON
+    (values JSON can not represent through `repr`) and any other object is formatted
+    with the `pformat` method from the `pprint` module.
     The formatted output is color-coded based on predefined prefixes in the string representation
     of the object. These prefixes are used to identify different log levels and apply corresponding colors:
 
@@ -36,54 +148,146 @@ def log(obj: Any):
     - 'ERR_' (Error): Logs the object with a red foreground and black background.
     - 'FATA' (Fatal): Logs the object with a black foreground and red background.
 
+    More prefixes can be added with `register_tag`.
     If the object's string representation doesn't match any of these prefixes, it defaults to INFO level logging.
+    Prefixes are matched case-insensitively (ASCII case only).
+    For strings the prefix is read before formatting, so messages whose level is disabled are not formatted at all.
+    Numbers, dictionaries, lists and tuples can not start with a prefix, they are logged at INFO level
+    and only formatted by the handlers that emit them.
 
     Note:
     - The function relies on the 'colorama' library for terminal coloring.
     - Different log levels are represented by different colors for better visibility and distinction.
     - In case 'colorama' is not installed or fails to initialize, logging will occur without color formatting.
+    - Colors are also left out when stdout or stderr is not a terminal (redirected to a file or a pipe).
 
     Example:
     >>> log("INFO: This is an informational message.")
     >>> log("ERR_: This is an error message.")
     >>> log("Custom log message.")
     """
-    out = pformat(obj, indent=4, width=sys.maxsize)
-
-    s = out[:4].upper()
-
-    pre = ""
-
-    if   s == 'DBG_':
-        if COL_IMPORTED: pre = col.Fore.LIGHTBLACK_EX + col.Back.BLACK
-        logging.log(logging.DEBUG, pre + out)
-    elif s == 'INFO':
-        if COL_IMPORTED: pre = col.Fore.WHITE + col.Back.BLACK
-        logging.log(logging.INFO,  pre + out)
-    elif s == 'WARN':
-        if COL_IMPORTED: pre = col.Fore.YELLOW + col.Back.BLACK
-        logging.log(logging.WARN,  pre + out)
-    elif s == 'ERR_':
-        if COL_IMPORTED: pre = col.Fore.RED + col.Back.BLACK
-        logging.log(logging.ERROR, pre + out)
-    elif s == 'FATA':
-        if COL_IMPORTED: pre = col.Fore.BLACK + col.Back.RED
-        logging.log(logging.FATAL, pre + out)
+    # the message is pre + "%s" with the object as its argument, so handlers only build it when they emit it
+    if isinstance(obj, str):
+        # the tag can be read before formatting, so filtered out messages cost a lookup and nothing else
+        level, _, fmt = _PREFIX_TABLE.get(obj[:4], _DEFAULT)
+        arg = obj
+    elif isinstance(obj, (int, float, bool, dict, list, tuple)):
+        # as numbers or JSON these never start with a tag, so formatting can wait
+        level, _, fmt = _DEFAULT
+        arg = _Formatted(obj)
     else:
-        if COL_IMPORTED: pre = col.Fore.WHITE + col.Back.BLACK
-        logging.log(logging.INFO,  pre + out)
+        arg = _format(obj)
+        level, _, fmt = _PREFIX_TABLE.get(arg[:4], _DEFAULT)
 
-class TqdmLoggingHandler(logging.Handler):
+    if not _IS_ENABLED(level):
+        return
+    if not _ROOT.handlers:
+        logging.basicConfig() # what logging.log() would have done for us
+    _LOG_IMPL(level, fmt, (arg,))
+
+class PrefixColorFilter(logging.Filter): # pylint: disable=too-few-public-methods
+    """
+    Logging filter that colors records logged through regular loggers the same way `log` does.
+
+    The color is picked from the first four characters of the record's message ('DBG_', 'INFO', 'WARN', 'ERR_'
+    or 'FATA', case-insensitively), or from the record's level like `ColorFormatter` does, and prepended to it.
+    The %-style arguments are left untouched, so they are still only formatted by the handlers that emit the record.
+    Messages that already start with an escape sequence (like the ones from `log`) are left alone.
+
+    Usage:
+        ```
+        logger = logging.getLogger(__name__)
+        logger.addFilter(PrefixColorFilter())
+        logger.warning("WARN: %d retries left", retries)
+        ```
+    """
+    def filter(self, record):
+        msg = str(record.msg)
+        entry = _PREFIX_TABLE.get(msg[:4])
+        pre = entry[1] if entry is not None else _LEVEL_COLORS.get(record.levelno, _DEFAULT[1])
+        if pre and not msg.startswith('\x1b'):
+            if record.args: # msg is a %-format, like log()'s prefixes a '%' in the color must not be read as one
+                pre = pre.replace('%', '%%')
+            record.msg = pre + msg + _RESET
+        return True
+
+class ColorFormatter(logging.Formatter):
+    """
+    Logging formatter that colors records the same way `log` does, so regular logger calls
+    (with lazy %-style arguments) get the same output without going through `log`.
+
+    The color is picked from the first four characters of the record's message (see `log` and `register_tag`),
+    or from the record's level when the message has no known prefix. The whole formatted line gets the color.
+    Messages that already start with an escape sequence (like the ones from `log`) are left alone.
+
+    Usage:
+        ```
+        handler = logging.StreamHandler()
+        handler.setFormatter(ColorFormatter("%(levelname)s: %(message)s"))
+        logging.getLogger().addHandler(handler)
+        ```
+    """
+    def format(self, record):
+        s = super().format(record)
+        if record.message.startswith('\x1b'):
+            return s
+        entry = _PREFIX_TABLE.get(record.message[:4])
+        pre = entry[1] if entry is not None else _LEVEL_COLORS.get(record.levelno, _DEFAULT[1])
+        return pre + s + _RESET if pre else s
+
+class _TqdmStream:
+    """
+    File-like object that writes through `tqdm.write`, so log lines do not break progress bars.
+    `tqdm.write` ends every line itself, handlers using it must have an empty terminator.
+    """
+    def write(self, msg: str):
+        """writes msg as its own line above the progress bars"""
+        tqdm.write(msg)
+
+    def flush(self):
+        """nothing to do, tqdm.write flushes on its own"""
+
+def make_tqdm_handler(level=logging.INFO) -> logging.StreamHandler:
+    """
+    Creates a plain `logging.StreamHandler` that redirects log messages to tqdm progress bars,
+    formatting them with `ColorFormatter`.
+
+    Args:
+    - level (int): The logging level for the handler (default is logging.INFO).
+
+    Returns:
+    - logging.StreamHandler: The handler, writing through `tqdm.write`.
+
+    Example:
+    >>> logging.getLogger().addHandler(make_tqdm_handler())
+    """
+    handler = logging.StreamHandler(_TqdmStream())
+    handler.terminator = '' # tqdm.write adds the newline
+    handler.setLevel(level)
+    handler.setFormatter(ColorFormatter())
+    return handler
+
+class TqdmLoggingHandler(logging.StreamHandler):
     """Custom logging handler that redirects log messages to tqdm progress bar.
 
-    This class extends the logging.Handler class to redirect log messages to a tqdm progress bar.
-    It is specifically designed to integrate logging output with tqdm's progress bar display.
+    This class is a `logging.StreamHandler` whose stream writes through `tqdm.write`,
+    it is specifically designed to integrate logging output with tqdm's progress bar display.
+    It is kept for backwards compatibility, `make_tqdm_handler` builds an equivalent handler without the buffer below.
+    Records are formatted with `ColorFormatter` unless another formatter is set.
+
+    By default every message is written right away. With a larger 'buffer_size' messages are buffered
+    and written with a single `tqdm.write` call once that many are pending or a WARNING (or worse) record arrives.
+    The buffer is also drained by `flush` and `close`, which `logging.shutdown` calls at exit,
+    buffered messages are lost if the process dies without them (crashes, `os._exit`).
 
     Attributes:
         level (int): The logging level for the handler (default is logging.INFO).
-    
+        buffer_size (int): Number of messages buffered before they are written (default is 1, no buffering).
+
     Methods:
-        emit(record): Overrides the base class's emit method to redirect log messages to tqdm.
+        emit(record): Buffers the formatted record, writing the buffer when it is full or the record is important.
+        flush(): Writes out the buffered messages.
+        close(): Flushes the buffer and closes the handler.
 
     Usage:
         To use this handler, create an instance of TqdmLoggingHandler and add it to the logger:
@@ -96,13 +300,36 @@ class TqdmLoggingHandler(logging.Handler):
         logger.addHandler(handler)
         ```
     """
+    buffer_size = 1
+
     def __init__(self, level=logging.INFO):
-        super().__init__(level)
+        super().__init__(_TqdmStream())
+        self.terminator = '' # tqdm.write adds the newline
+        self.setLevel(level)
+        self.setFormatter(ColorFormatter())
+
+        self._buf: list = []
 
     def emit(self, record):
         try:
-            msg = self.format(record)
-            tqdm.write(msg)
-            self.flush()
+            self._buf.append(self.format(record))
+            if len(self._buf) >= self.buffer_size or record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
         except Exception: # pylint: disable=broad-exception-caught
             self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._buf:
+                self.stream.write("\n".join(self._buf) + self.terminator)
+                self._buf.clear()
+            super().flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()